@@ -1,15 +1,29 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+import orjson
 
 app = FastAPI()
 
 import swisseph as swe
+import numpy as np
+import numba
 import math
 import datetime
+import copy
+import functools
+import threading
 import json
 
 
-app = FastAPI()
+class ORJSONResponse(JSONResponse):
+    # orjson serializes the response dict in C; numpy scalars are handled natively.
+    # Defined here since fastapi.responses.ORJSONResponse is deprecated upstream
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # --- CORS for Lovable frontend ---
 app.add_middleware(
@@ -23,6 +37,7 @@ app.add_middleware(
 
 # ---------------------- Configuration --------------------------------
 EPHE_PATH = None  # set to your ephemeris files folder if needed
+_swe_thread = threading.local()  # swisseph state is per thread, so is the mode we last set
 PLANETS = [
     (swe.SUN, 'Sun'),
     (swe.MOON, 'Moon'),
@@ -33,6 +48,7 @@ PLANETS = [
     (swe.SATURN, 'Saturn'),
     (swe.MEAN_NODE, 'Rahu')  # we'll add Ketu as opposite
 ]
+PLANET_ID = {name:i for i,(_,name) in enumerate(PLANETS)}
 
 # Vimshottari sequence and proportions
 VIMSHOTTARI_ORDER = ['Ketu','Venus','Sun','Moon','Mars','Rahu','Jupiter','Saturn','Mercury']
@@ -40,6 +56,13 @@ VIM_YEARS = [7,20,6,10,7,18,16,19,17]
 VIM_TOTAL = sum(VIM_YEARS)
 #VIM_PROPORTIONS = [y / VIM_TOTAL for y in VIM_YEARS]
 VIM_PROPORTIONS = [y/sum(VIM_YEARS) for y in VIM_YEARS]
+VIM_ORDER_ARR = np.array(VIMSHOTTARI_ORDER, dtype=object)
+LORD_TO_IDX = {name:i for i,name in enumerate(VIMSHOTTARI_ORDER)}
+
+# Row i holds the sequence rotated to start from lord i: cumulative proportions
+# (upper bound of each sub-division within 0..1) and the matching lord ids
+VIM_CUM = np.array([np.cumsum(np.roll(VIM_PROPORTIONS, -i)) for i in range(9)])
+VIM_ORDER_ROT = np.array([np.roll(np.arange(9), -i) for i in range(9)])
 
 # Nakshatra names and their lords (standard sequence starting from Ashwini)
 NAK_SHAPES = [
@@ -58,11 +81,29 @@ SIGN_RULER = {
 }
 SIGN_NAMES = ['Aries','Taurus','Gemini','Cancer','Leo','Virgo','Libra','Scorpio','Sagittarius','Capricorn','Aquarius','Pisces']
 
+# Lookup tables for the vectorized path (indexed 0..11 / 0..26)
+SIGN_NAMES_ARR = np.array(SIGN_NAMES, dtype=object)
+SIGN_RULER_ARR = np.array([SIGN_RULER[i+1] for i in range(12)], dtype=object)
+NAK_NAMES_ARR = np.array([n for n,_ in NAK_SHAPES], dtype=object)
+NAK_LORDS_ARR = np.array([l for _,l in NAK_SHAPES], dtype=object)
+NAK_LORD_IDX = np.array([LORD_TO_IDX[l] for _,l in NAK_SHAPES], dtype=np.int8)
+NAK_SIZE = 360.0 / 27.0  # 13°20′ = 13.333333...
+
+# Slot sizes in integer arcseconds (sign/nakshatra/pada boundaries are exact)
+ARCSEC = 1_296_000  # 360°
+SIGN_ARCSEC = ARCSEC // 12  # 30° = 108000
+NAK_ARCSEC = ARCSEC // 27  # 13°20′ = 48000
+PADA_ARCSEC = NAK_ARCSEC // 4  # 3°20′ = 12000
+
 # -------------------- Helper functions --------------------------------
 
 def parse_date_time(date_str, time_str):
     y,m,d = [int(x) for x in date_str.split('-')]
     hh,mm,ss = [int(x) for x in time_str.split(':')]
+    # swe.julday accepts any numbers, so reject invalid dates/times here
+    # (raises ValueError)
+    datetime.date(y,m,d)
+    datetime.time(hh,mm,ss)
     return y,m,d,hh,mm,ss
 
 
@@ -72,279 +113,230 @@ def to_julian_day(year, month, day, hour=0, minute=0, second=0):
 
 
 def normalize_angle(a):
-    a = a % 360.0
-    if a < 0:
-        a += 360.0
-    return a
-
+    # works on floats and numpy arrays alike; % takes the sign of the divisor,
+    # so no negative fixup is needed
+    return a % 360.0
 
-def sign_from_deg(deg):
-    deg = normalize_angle(deg)
-    sign_idx = int(deg // 30) + 1
-    sign_name = SIGN_NAMES[sign_idx - 1]
-    return sign_idx, sign_name
 
-def get_nak_charan_and_pos(sid_deg):
-    # Normalize the degree
-    sid_deg = sid_deg % 360.0
+def to_arcsec(deg):
+    # integer arcseconds in [0, ARCSEC)
+    return np.floor(np.asarray(deg) * 3600.0).astype(np.int64) % ARCSEC
 
-    nak_size = 360.0 / 27.0  # 13°20′ = 13.333333...
-    nak_index = int(sid_deg // nak_size) + 1
-    if nak_index > 27:
-        nak_index = 27
 
-    nak_name, nak_lord = NAK_SHAPES[nak_index - 1]
+def sign_from_arcsec(lon_as):
+    # lon_as is an array of sidereal longitudes in arcseconds; returns 1-based sign ids and names
+    sign_idx = lon_as // SIGN_ARCSEC
+    return sign_idx + 1, SIGN_NAMES_ARR[sign_idx]
 
-    nak_start = (nak_index - 1) * nak_size
-    pos_in_nak = sid_deg - nak_start
-
-    # Fix tiny floating negative due to rounding
-    if pos_in_nak < 0:
-        pos_in_nak += nak_size
+def get_nak_charan_and_pos(sid_deg, lon_as):
+    nak_index = lon_as // NAK_ARCSEC
 
     # Each nakshatra has 4 padas
-    pada_size = nak_size / 4.0
-    charan = int(pos_in_nak // pada_size) + 1
-    if charan > 4:
-        charan = 4
-
-    return nak_index, nak_name, nak_lord, charan, pos_in_nak, nak_size
-
-
-def find_sub_lord_recursive(pos_in_nak_deg, nak_size, nak_lord, levels=3):
-    VIM_ORDER = ['Ketu','Venus','Sun','Moon','Mars','Rahu','Jupiter','Saturn','Mercury']
-    VIM_YEARS = [7,20,6,10,7,18,16,19,17]
-    total = sum(VIM_YEARS)
-    VIM_PROP = [y / total for y in VIM_YEARS]
-
-    # Rotate sequence so Nakshatra starts with its lord
-    idx = VIM_ORDER.index(nak_lord)
-    order = VIM_ORDER[idx:] + VIM_ORDER[:idx]
-    props = VIM_PROP[idx:] + VIM_PROP[:idx]
-
-    lords = []
-    cur_pos = pos_in_nak_deg / nak_size  # normalize 0–1
-
-    for _ in range(levels):
-        cumulative = 0.0
-        for lord, prop in zip(order, props):
-            next_cum = cumulative + prop
-            if cur_pos <= next_cum or abs(cur_pos - 1.0) < 1e-9:
-                lords.append(lord)
-                cur_pos = (cur_pos - cumulative) / prop
-                # rotate again for next level starting from current sublord
-                idx2 = VIM_ORDER.index(lord)
-                order = VIM_ORDER[idx2:] + VIM_ORDER[:idx2]
-                props = VIM_PROP[idx2:] + VIM_PROP[:idx2]
-                break
-            cumulative = next_cum
+    charan = (lon_as - nak_index * NAK_ARCSEC) // PADA_ARCSEC + 1
+
+    # degrees into the nakshatra for the sub-lord descent, taken from the same
+    # wrapped arcseconds plus the sub-arcsecond fraction so it always agrees
+    # with nak_index (a longitude of exactly 360.0 wraps to 0)
+    sec = np.asarray(sid_deg) * 3600.0
+    pos_in_nak = ((lon_as - nak_index * NAK_ARCSEC) + (sec - np.floor(sec))) / 3600.0
+
+    return nak_index + 1, NAK_NAMES_ARR[nak_index], NAK_LORDS_ARR[nak_index], charan, pos_in_nak, NAK_SIZE
+
+
+@numba.njit(cache=True, fastmath=True)
+def _sublords_nb(cur_pos, nak_lord_idx, vim_cum, vim_rot, out):
+    # cur_pos: position within the nakshatra (0–1), nak_lord_idx: starting lord ids;
+    # fills out[n, level] with the lord id at each level of the Vimshottari descent
+    for n in range(cur_pos.shape[0]):
+        idx = nak_lord_idx[n]
+        pos = cur_pos[n]
+        for level in range(out.shape[1]):
+            k = 0
+            while k < 8 and pos > vim_cum[idx, k]:
+                k += 1
+            prev = vim_cum[idx, k-1] if k > 0 else 0.0
+            pos = (pos - prev) / (vim_cum[idx, k] - prev)
+            # next level starts from the current sublord
+            idx = vim_rot[idx, k]
+            out[n, level] = idx
+
+
+def find_sub_lord_recursive(pos_in_nak_deg, nak_size, nak_lord_idx, levels=3):
+    # Batched over all points: pos_in_nak_deg and nak_lord_idx are length-N arrays,
+    # returns an (N, levels) array of lord ids (index into VIMSHOTTARI_ORDER)
+    idx = np.asarray(nak_lord_idx)
+    cur_pos = np.asarray(pos_in_nak_deg, dtype=np.float64) / nak_size  # normalize 0–1
+
+    lords = np.empty((len(idx), levels), dtype=np.int64)
+    _sublords_nb(cur_pos, idx, VIM_CUM, VIM_ORDER_ROT, lords)
 
     return lords
     
-def is_retrograde(jd, pconst, delta_days=2.0):
-    lon1 = swe.calc_ut(jd, pconst)[0][0] if isinstance(swe.calc_ut(jd, pconst)[0], (list,tuple)) else swe.calc_ut(jd, pconst)[0]
-    lon2 = swe.calc_ut(jd + delta_days, pconst)[0][0] if isinstance(swe.calc_ut(jd + delta_days, pconst)[0], (list,tuple)) else swe.calc_ut(jd + delta_days, pconst)[0]
-    # normalize difference
-    d = normalize_angle(lon2 - lon1)
-    # if motion backwards more than 180 (i.e. negative real change), treat as retro
-    # Better: if d > 180 then actual change is d-360 which is negative
-    if d > 180:
-        d = d - 360
+
+def calc_lon(jd, pconst):
+    calc = swe.calc_ut(jd, pconst)
+    # calc sometimes returns nested structure; handle both
+    return calc[0][0] if isinstance(calc[0], (list,tuple)) else calc[0]
+
+
+def is_retrograde(lon_now, lon_later):
+    # signed change in (-180, 180]; negative means backwards motion
+    d = ((np.asarray(lon_later) - lon_now + 540.0) % 360.0) - 180.0
     return d < 0
 
 
-@app.get("/")
-def home():
-    return {"message": "KP API running!"}
+def assign_houses(sid_lons, cusp_sid):
+    # Rotate everything so cusp 1 sits at 0; each house then spans
+    # [cusp_i, cusp_{i+1}) on a single increasing axis and one searchsorted
+    # finds the house of every longitude
+    asc = cusp_sid[0]
+    rot_cusps = normalize_angle(cusp_sid - asc)
+    order = np.argsort(rot_cusps, kind='stable')
+    slot = np.searchsorted(rot_cusps[order], normalize_angle(sid_lons - asc), side='right') - 1
+    return order[slot] + 1
 
-@app.get("/api/kp_chart")
-def compute_kp_json(date_str:str, time_str:str, lat:float, lon:float, tz_offset_hours:float, ayan_mode='Lahiri'):
-    """Compute KP JSON dict for given local date/time (with seconds) and location.
-    ayan_mode: 'KP' or 'LAHIRI' (we set SWEPY sidereal mode accordingly)
+
+# -------------------- Core computation --------------------------------
+
+@functools.lru_cache(maxsize=4096)
+def _compute(date_str, time_str, lat, lon, tz_offset_hours, ayan_mode):
+    """Pure KP computation behind compute_kp_json; cached on its inputs.
+    The returned dict is shared between cache hits and must not be mutated.
     """
-    global JD
     y,m,d,hh,mm,ss = parse_date_time(date_str, time_str)
-    # convert local to UT
-    local_dt = datetime.datetime(y,m,d,hh,mm,ss)
-    ut_dt = local_dt - datetime.timedelta(hours=tz_offset_hours)
-    JD = to_julian_day(ut_dt.year, ut_dt.month, ut_dt.day, ut_dt.hour, ut_dt.minute, ut_dt.second)
+    # convert local to UT in the JD domain; swe.julday accepts hours outside 0..24
+    JD = to_julian_day(y, m, d, hh - tz_offset_hours, mm, ss)
 
-    # set ephemeris path if provided
+    # swisseph state (sidereal mode, ephemeris path) is per thread, so each
+    # request thread sets what it needs before computing.
+    # Set ephemeris path if provided
     if EPHE_PATH:
         swe.set_ephe_path(EPHE_PATH)
 
-    # set sidereal mode to KP if requested
-    if ayan_mode.upper().startswith('KP'):
+    # set sidereal mode to KP if requested; only touch swisseph when it changes
+    desired = swe.SIDM_KRISHNAMURTI if ayan_mode.upper().startswith('KP') else swe.SIDM_LAHIRI
+    if getattr(_swe_thread, 'sid_mode', None) != desired:
         try:
-            swe.set_sid_mode(swe.SIDM_KRISHNAMURTI, 0, 0)
+            swe.set_sid_mode(desired, 0, 0)
+            _swe_thread.sid_mode = desired
         except Exception:
             # fallback: leave default and rely on get_ayanamsa_ut
             pass
-    else:
-        try:
-            swe.set_sid_mode(swe.SIDM_LAHIRI, 0, 0)
-        except Exception:
-            pass
 
     ayanamsha = swe.get_ayanamsa_ut(JD)
+    cusps, ascmc = swe.houses(JD, lat, lon)
 
-    out = {'ayanamsha': ayanamsha, 'houses': [], 'planets': []}
-
-    # Planets
-    for pconst, pname in PLANETS:
-        calc = swe.calc_ut(JD, pconst)
-        # calc sometimes returns nested structure; handle both
-        if isinstance(calc[0], (list,tuple)):
-            tropical_lon = calc[0][0]
-        else:
-            tropical_lon = calc[0]
-        tropical_lon = normalize_angle(tropical_lon)
-        sid_lon = normalize_angle(tropical_lon - ayanamsha)
-
-        sign_id, sign_name = sign_from_deg(sid_lon)
-        sign_lord = SIGN_RULER[sign_id]
-        nak_idx, nak_name, nak_lord, charan, pos_in_nak, nak_size = get_nak_charan_and_pos(sid_lon)
-        sub_lords = find_sub_lord_recursive(pos_in_nak, nak_size,nak_lord, levels=3)
-        # determine retrograde
-        retro = is_retrograde(JD, pconst)
-
-        # determine house placement: find which house cusp the planet's sidereal longitude falls into
-        # compute cusps to use for house determination
-        #cusps, ascmc = swe.houses_ex(JD, lat, lon) if hasattr(swe, 'houses_ex') else swe.houses(JD, lat, lon)
-        # normalize cusps list to length 12 starting indexes 1..12
-
-        cusps, ascmc = swe.houses(JD, lat, lon) 
-        if len(cusps) == 13:
-            cusp_list = [cusps[i] for i in range(1,13)]
-        elif len(cusps) == 12:
-            cusp_list = [cusps[i] for i in range(0,12)]
-        else:
-            raise ValueError('Unexpected cusps length: %s' % len(cusps))
-        # build ranges for houses (from cusp_i to cusp_{i+1})
-        house_no = None
-        for i in range(12):
-            start = normalize_angle(cusp_list[i] - ayanamsha)
-            end = normalize_angle((cusp_list[(i+1)%12] - ayanamsha))
-            pdeg = sid_lon
-            if start <= end:
-                if pdeg >= start and pdeg < end:
-                    house_no = i+1
-                    break
-            else:
-                # wraps around 360
-                if pdeg >= start or pdeg < end:
-                    house_no = i+1
-                    break
-        if house_no is None:
-            house_no = 12
-
-        # house_lord is ruler of the sign on that cusp
-        #cusp_sign_id = int(((normalize_angle(cusp_list[0] - ayanamsha) // 30)) + 1) if len(cusp_list) else None
+    # Planet positions now and two days later, one ephemeris call per planet each
+    lons_now = np.array([calc_lon(JD, pconst) for pconst, _ in PLANETS])
+    lons_later = np.array([calc_lon(JD + 2.0, pconst) for pconst, _ in PLANETS])
 
-        out['planets'].append({
-            'planet_name': pname,
-            'planet_id': list(map(lambda x: x[1], PLANETS)).index(pname),
-            'full_degree': round(sid_lon, 6),
-            'norm_degree': round(sid_lon % 30, 6),
-            'is_retro': bool(retro),
-            'sign_id': sign_id,
-            'sign_name': sign_name,
-            'sign_lord': sign_lord,
-            'house': house_no,
-            'house_lord': SIGN_RULER[((int((normalize_angle(cusp_list[house_no-1]-ayanamsha)//30))+1))],
-            'nakshatra_name': nak_name,
-            'nakshatra_id': nak_idx,
-            'nakshatra_lord': nak_lord,
-            'nakshatra_charan': charan,
-            'sub_lord': sub_lords[0],
-            'sub_sub_lord': sub_lords[1] if len(sub_lords) > 1 else None,
-            'sub_sub_sub_lord': sub_lords[2] if len(sub_lords) > 2 else None
-        })
-
-   # Find Rahu data
-    rahu = next((p for p in out['planets'] if p['planet_name'] == 'Rahu'), None)
-    if rahu:
-        ketu_sid_lon = normalize_angle(rahu['full_degree'] + 180)
-
-        # Determine sign, nakshatra etc. same as above
-        sign_id, sign_name = sign_from_deg(ketu_sid_lon)
-        sign_lord = SIGN_RULER[sign_id]
-        nak_idx, nak_name, nak_lord, charan, pos_in_nak, nak_size = get_nak_charan_and_pos(ketu_sid_lon)
-        sub_lords = find_sub_lord_recursive(pos_in_nak, nak_size, nak_lord, levels=3)
-
-        # Determine house for Ketu using same cusp logic
-        house_no = None
-        for i in range(12):
-            start = normalize_angle(cusp_list[i] - ayanamsha)
-            end = normalize_angle((cusp_list[(i + 1) % 12] - ayanamsha))
-            pdeg = ketu_sid_lon
-            if start <= end:
-                if pdeg >= start and pdeg < end:
-                    house_no = i + 1
-                    break
-            else:
-                if pdeg >= start or pdeg < end:
-                    house_no = i + 1
-                    break
-        if house_no is None:
-            house_no = 12
-
-        out['planets'].append({
-            'planet_name': 'Ketu',
-            'planet_id': 100,  # custom ID
-            'full_degree': round(ketu_sid_lon, 6),
-            'norm_degree': round(ketu_sid_lon % 30, 6),
-            'is_retro': rahu['is_retro'],
-            'sign_id': sign_id,
-            'sign_name': sign_name,
-            'sign_lord': sign_lord,
-            'house': house_no,
-            'house_lord': SIGN_RULER[((int((normalize_angle(cusp_list[house_no - 1] - ayanamsha) // 30)) + 1))],
-            'nakshatra_name': nak_name,
-            'nakshatra_id': nak_idx,
-            'nakshatra_lord': nak_lord,
-            'nakshatra_charan': charan,
-            'sub_lord': sub_lords[0],
-            'sub_sub_lord': sub_lords[1] if len(sub_lords) > 1 else None,
-            'sub_sub_sub_lord': sub_lords[2] if len(sub_lords) > 2 else None
-        })
-     # Houses
-    #cusps, ascmc = swe.houses_ex(JD, lat, lon) if hasattr(swe, 'houses_ex') else swe.houses(JD, lat, lon)
-  
-    JD = to_julian_day(ut_dt.year, ut_dt.month, ut_dt.day, ut_dt.hour, ut_dt.minute, ut_dt.second)
-    print(JD)
-    cusps, ascmc = swe.houses(JD, lat, lon) 
+    # house cusps, normalized to a list of 12 (swe may return 13 with index 0 unused)
     if len(cusps) == 13:
-        cusp_list = [cusps[i] for i in range(1,13)]
+        cusp_list = list(cusps[1:13])
     elif len(cusps) == 12:
-        cusp_list = [cusps[i] for i in range(0,12)]
+        cusp_list = list(cusps[:12])
     else:
         raise ValueError('Unexpected cusps length: %s' % len(cusps))
+    cusp_sid = normalize_angle(np.asarray(cusp_list, dtype=np.float64) - ayanamsha)
+    cusp_sign_idx = (cusp_sid // 30).astype(int)
+    cusp_sign_lord_arr = SIGN_RULER_ARR[cusp_sign_idx]
 
-    for i in range(12):
-        cusp_trop = normalize_angle(cusp_list[i])
-        cusp_sid = normalize_angle(cusp_trop - ayanamsha)
-        print(cusp_sid)
-        sign_id, sign_name = sign_from_deg(cusp_sid)
-        sign_lord = SIGN_RULER[sign_id]
-        nak_idx, nak_name, nak_lord, charan, pos_in_nak, nak_size = get_nak_charan_and_pos(cusp_sid)
-        
-        sub_lords = find_sub_lord_recursive(pos_in_nak, nak_size,nak_lord, levels=3)
+    out = {'ayanamsha': ayanamsha, 'houses': [], 'planets': []}
 
+    # Planets, with Ketu (always opposite Rahu) appended as a 9th entry so it
+    # goes through the same vectorized derivation
+    n_planets = len(PLANETS) + 1
+    planet_sid = np.empty(n_planets)
+    planet_sid[:-1] = normalize_angle(normalize_angle(lons_now) - ayanamsha)
+    planet_sid[-1] = normalize_angle(planet_sid[-2] + 180.0)
+    planet_retro = np.empty(n_planets, dtype=bool)
+    planet_retro[:-1] = is_retrograde(lons_now, lons_later)
+    planet_retro[-1] = planet_retro[-2]  # Ketu moves with Rahu
+
+    # determine house placement for planets and Ketu in one pass
+    planet_house = assign_houses(planet_sid, cusp_sid)
+
+    # KP attributes for planets (incl. Ketu) and cusps in one pass
+    sid = np.concatenate([planet_sid, cusp_sid])
+    lon_as = to_arcsec(sid)
+    sign_ids, sign_names = sign_from_arcsec(lon_as)
+    sign_lords = SIGN_RULER_ARR[sign_ids - 1]
+    nak_ids, nak_names, nak_lords, charans, pos_in_naks, nak_size = get_nak_charan_and_pos(sid, lon_as)
+    sub_lord_idx = find_sub_lord_recursive(pos_in_naks, nak_size, NAK_LORD_IDX[nak_ids - 1], levels=3)
+    sub_lords = VIM_ORDER_ARR[sub_lord_idx]
+    house_lords = cusp_sign_lord_arr[planet_house - 1]
+
+    # gathered columns as plain lists: per-field indexing below then yields
+    # Python ints/strs directly instead of boxing numpy scalars one at a time
+    sign_ids, sign_names, sign_lords = sign_ids.tolist(), sign_names.tolist(), sign_lords.tolist()
+    nak_ids, nak_names, nak_lords, charans = nak_ids.tolist(), nak_names.tolist(), nak_lords.tolist(), charans.tolist()
+    sub_lords = sub_lords.tolist()
+    full_degs = np.round(sid, 6).tolist()
+    norm_degs = np.round(np.mod(sid, 30.0), 6).tolist()
+    planet_house, house_lords, planet_retro = planet_house.tolist(), house_lords.tolist(), planet_retro.tolist()
+
+    for i in range(n_planets):
+        is_ketu = i == n_planets - 1
+        pname = 'Ketu' if is_ketu else PLANETS[i][1]
+        out['planets'].append({
+            'planet_name': pname,
+            'planet_id': 100 if is_ketu else PLANET_ID[pname],  # custom ID for Ketu
+            'full_degree': full_degs[i],
+            'norm_degree': norm_degs[i],
+            'is_retro': planet_retro[i],
+            'sign_id': sign_ids[i],
+            'sign_name': sign_names[i],
+            'sign_lord': sign_lords[i],
+            'house': planet_house[i],
+            'house_lord': house_lords[i],
+            'nakshatra_name': nak_names[i],
+            'nakshatra_id': nak_ids[i],
+            'nakshatra_lord': nak_lords[i],
+            'nakshatra_charan': charans[i],
+            'sub_lord': sub_lords[i][0],
+            'sub_sub_lord': sub_lords[i][1],
+            'sub_sub_sub_lord': sub_lords[i][2]
+        })
+
+    for h in range(12):
+        i = n_planets + h
         out['houses'].append({
-            'house_id': i+1,
-            'full_degree': round(cusp_sid, 6),
-            'norm_degree': round(cusp_sid % 30, 6),
-            'sign_id': sign_id,
-            'sign_name': sign_name,
-            'sign_lord': sign_lord,
-            'nakshatra_id': nak_idx,
-            'nakshatra_name': nak_name,
-            'nakshatra_lord': nak_lord,
-            'nakshatra_charan': charan,
-            'sub_lord': sub_lords[0],
-            'sub_sub_lord': sub_lords[1] if len(sub_lords) > 1 else None,
-            'sub_sub_sub_lord': sub_lords[2] if len(sub_lords) > 2 else None
+            'house_id': h+1,
+            'full_degree': full_degs[i],
+            'norm_degree': norm_degs[i],
+            'sign_id': sign_ids[i],
+            'sign_name': sign_names[i],
+            'sign_lord': sign_lords[i],
+            'nakshatra_id': nak_ids[i],
+            'nakshatra_name': nak_names[i],
+            'nakshatra_lord': nak_lords[i],
+            'nakshatra_charan': charans[i],
+            'sub_lord': sub_lords[i][0],
+            'sub_sub_lord': sub_lords[i][1],
+            'sub_sub_sub_lord': sub_lords[i][2]
         })
 
     return out
+
+
+@app.get("/")
+def home():
+    return {"message": "KP API running!"}
+
+def _cached_kp_json(date_str, time_str, lat, lon, tz_offset_hours, ayan_mode):
+    # round inputs so near-identical requests share a cache entry
+    return _compute(date_str, time_str, round(lat, 6), round(lon, 6), round(tz_offset_hours, 4), ayan_mode.upper())
+
+
+def compute_kp_json(date_str:str, time_str:str, lat:float, lon:float, tz_offset_hours:float, ayan_mode='Lahiri'):
+    """Compute KP JSON dict for given local date/time (with seconds) and location.
+    ayan_mode: 'KP' or 'LAHIRI' (we set SWEPY sidereal mode accordingly)
+    """
+    # copy so callers can't mutate the cached result
+    return copy.deepcopy(_cached_kp_json(date_str, time_str, lat, lon, tz_offset_hours, ayan_mode))
+
+
+@app.get("/api/kp_chart")
+def kp_chart(date_str:str, time_str:str, lat:float, lon:float, tz_offset_hours:float, ayan_mode='Lahiri'):
+    # the cached dict is serialized as-is by orjson, skipping jsonable_encoder and the copy
+    return ORJSONResponse(_cached_kp_json(date_str, time_str, lat, lon, tz_offset_hours, ayan_mode))